@@ -6,11 +6,22 @@ from .buckets import *
 from .rate import *
 from .constants import *
 from .rate_limiter import *
+from .keyed_rate_limiter import *
+from .admission import *
+from .clock import *
+from .batch import *
 
 __all__ = [
     "RateLimiter",
+    "KeyedRateLimiter",
+    "BatchBucketEngine",
+    "Admission",
     "Rate",
     "TimeUnit",
+    "Clock",
+    "MonotonicClock",
+    "WallClock",
+    "VirtualClock",
     "InMemoryBucket",
     "RedisBucket",
     "SQLite3Bucket"
@@ -0,0 +1,79 @@
+import math
+from typing import Optional
+
+class Admission(object):
+    """
+    Result of a non blocking acquisition attempt
+
+    attrs:
+        :admitted:
+            -> True if the space was acquired. For a reservation, the caller may only proceed once retry_after
+            seconds have passed
+        :retry_after:
+            -> Seconds until the space is (or would be) available, suitable for a Retry-After header
+    """
+    __slots__ = ('admitted', 'retry_after')
+
+    def __init__(self, admitted: bool, retry_after: float = 0.0):
+        self.admitted = admitted
+        self.retry_after = retry_after
+
+    def __repr__(self):
+        return f"<Admission - admitted: {self.admitted}, retry_after: {self.retry_after}>"
+
+    def __bool__(self):
+        return self.admitted
+
+class AdmissionMixin(object):
+    """
+    Non blocking acquisition API shared by buckets and RateLimiter
+
+    Relies on the class having a clock and implementing _check_cost(task_cost) and _try_consume(task_cost, max_wait),
+    where the latter books the space if it is available within max_wait seconds and returns the wait either way
+    """
+    __slots__ = ()
+
+    def try_acquire(self, task_cost: int = 1, max_wait: float = 0.0) -> Admission:
+        """
+        Acquires the space if it is available now, or within max_wait seconds (sleeping for up to that long).
+        Otherwise returns straight away without consuming anything, with the predicted wait as retry_after
+        """
+        self._check_cost(task_cost)
+
+        waited = 0.0
+        wait = self._try_consume(task_cost)
+        while wait:
+            if waited + wait > max_wait:
+                return Admission(False, wait)
+            self.clock.sleep(wait)
+            waited += wait
+            wait = self._try_consume(task_cost)
+        return Admission(True)
+
+    async def async_try_acquire(self, task_cost: int = 1, max_wait: float = 0.0) -> Admission:
+        """
+        Asynchronous counterpart to try_acquire, sleeping with the clock's async_sleep
+        """
+        self._check_cost(task_cost)
+
+        waited = 0.0
+        wait = self._try_consume(task_cost)
+        while wait:
+            if waited + wait > max_wait:
+                return Admission(False, wait)
+            await self.clock.async_sleep(wait)
+            waited += wait
+            wait = self._try_consume(task_cost)
+        return Admission(True)
+
+    def reserve(self, task_cost: int = 1, max_wait: Optional[float] = None) -> Admission:
+        """
+        Books the space immediately without blocking, even if it only frees up in the future. The returned
+        retry_after is how long the caller must wait before using it. If max_wait is given and the wait would be
+        longer, nothing is booked and the admission is refused
+        """
+        self._check_cost(task_cost)
+
+        max_wait = math.inf if max_wait is None else max_wait
+        wait = self._try_consume(task_cost, max_wait)
+        return Admission(wait <= max_wait, wait)
@@ -0,0 +1,124 @@
+from typing import Dict, Hashable, Iterable, Optional, Tuple, Union
+from .rate import Rate
+from .constants import VOLUME_TOLERANCE
+from .clock import Clock, MonotonicClock
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+class BatchBucketEngine(object):
+    """
+    Vectorised leaky buckets for checking the same rate across many keys at once
+
+    The volume and last checked time of every key are held in NumPy arrays, so a whole batch is dripped, admitted and
+    updated with a handful of array operations rather than a Python level loop over buckets. The per key math is the
+    same as AbstractBaseBucket._leak and _wait_time. Requires numpy.
+
+    args:
+        :drip_rate:
+            -> Rate applied to every key
+
+    kwargs:
+        :initial_size:
+            -> Number of keys to preallocate space for, the arrays double in size whenever they run out
+        :clock:
+            -> Clock used when acquire_batch isn't given the current time, defaults to a monotonic clock
+    """
+    def __init__(self,
+        drip_rate: Rate,
+        initial_size: int = 1024,
+        clock: Clock = None
+    ):
+        if np is None:
+            raise ImportError("numpy is required to use BatchBucketEngine")
+
+        self.drip_rate = drip_rate
+        self.clock = clock if clock is not None else MonotonicClock()
+        self.volumes = np.zeros(initial_size, dtype=np.float64)
+        self.last_time_checked = np.zeros(initial_size, dtype=np.float64)
+        self._index: Dict[Hashable, int] = {}
+
+    def __repr__(self):
+        return f"<BatchBucketEngine - {len(self)} keys, rate: {self.drip_rate}>"
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._index
+
+    def current_volume(self, key: Hashable) -> float:
+        index = self._index.get(key)
+        return 0.0 if index is None else float(self.volumes[index])
+
+    def _indices(self, keys: Iterable[Hashable]) -> "np.ndarray":
+        index = self._index
+        indices = np.fromiter(
+            (index[key] if key in index else index.setdefault(key, len(index)) for key in keys),
+            dtype=np.intp
+        )
+        if len(index) > len(self.volumes):
+            size = len(self.volumes) or 1
+            while size < len(index):
+                size *= 2
+            padding = np.zeros(size - len(self.volumes), dtype=np.float64)
+            self.volumes = np.concatenate((self.volumes, padding))
+            self.last_time_checked = np.concatenate((self.last_time_checked, padding))
+        return indices
+
+    def acquire_batch(self,
+        keys: Iterable[Hashable],
+        costs: Union[int, float, Iterable[Union[int, float]]] = 1,
+        now: Optional[float] = None
+    ) -> Tuple["np.ndarray", "np.ndarray"]:
+        """
+        Drips, checks and consumes space for every (key, cost) pair in one go
+
+        Requests for the same key are admitted in batch order. Each one counts towards the space used by the requests
+        after it, so with equal costs the result is exactly that of acquiring one at a time. Returns a boolean admit
+        mask and the per request retry after in seconds (0 where admitted), both in the order of keys.
+        """
+        now = self.clock.now() if now is None else now
+        capacity = self.drip_rate.max_capacity
+        rate = self.drip_rate.rate
+
+        indices = self._indices(keys)
+        costs = np.broadcast_to(np.asarray(costs, dtype=np.float64), indices.shape)
+
+        # group requests for the same key together, keeping batch order within each group
+        order = np.argsort(indices, kind='stable')
+        sorted_indices = indices[order]
+        sorted_costs = costs[order]
+        group_starts = np.empty(len(sorted_indices), dtype=bool)
+        group_starts[:1] = True
+        np.not_equal(sorted_indices[1:], sorted_indices[:-1], out=group_starts[1:])
+        groups = np.cumsum(group_starts) - 1
+        keys_index = sorted_indices[group_starts]
+
+        # drip every key once
+        volumes = self.volumes[keys_index]
+        elapsed = now - self.last_time_checked[keys_index]
+        volumes = np.where(volumes > 0, np.maximum(volumes - elapsed * rate, 0), volumes)
+
+        # running cost of each request including those before it for the same key
+        cumulative_costs = np.cumsum(sorted_costs)
+        group_offsets = (cumulative_costs - sorted_costs)[group_starts]
+        running_costs = cumulative_costs - group_offsets[groups]
+
+        admitted = volumes[groups] + running_costs - capacity <= VOLUME_TOLERANCE
+        admitted_costs = np.bincount(groups, weights=sorted_costs * admitted, minlength=len(keys_index))
+
+        overflow = volumes[groups] + admitted_costs[groups] + sorted_costs - capacity
+        retry_after = np.where(admitted, 0.0, np.maximum(overflow, 0) / rate)
+        retry_after[sorted_costs > capacity] = np.inf
+
+        self.volumes[keys_index] = volumes + admitted_costs
+        self.last_time_checked[keys_index] = now
+
+        admit_mask = np.empty_like(admitted)
+        admit_mask[order] = admitted
+        retry = np.empty_like(retry_after)
+        retry[order] = retry_after
+        return admit_mask, retry
@@ -1,23 +1,31 @@
-import time
-import asyncio
-from collections import OrderedDict
 from abc import ABC, abstractmethod
-from typing import Union
+from typing import List, Sequence, Tuple, Union
 from ..rate import Rate
+from ..constants import VOLUME_TOLERANCE
+from ..admission import AdmissionMixin
+from ..clock import Clock, WallClock
+from ..waiters import AsyncWaiterQueue
 
-class AbstractBaseBucket(ABC):
+class AbstractBaseBucket(AdmissionMixin, ABC):
+    # slotted so that limiters holding a bucket per key stay small, subclasses with extra state may still use a dict
+    __slots__ = ('bucket_id', 'max_capacity', 'drip_rate', 'clock', '_async_waiters', '__weakref__')
+
+    # clock used when none is given, persistent backends shared between processes need a shared epoch
+    default_clock: Clock = WallClock()
 
     def __init__(self, 
         bucket_id: str,
         max_capacity: int, 
         drip_rate: Rate,
+        clock: Clock = None,
         **kwargs
     ):
         self.bucket_id = bucket_id
         self.max_capacity = max_capacity
         self.drip_rate = drip_rate
+        self.clock = clock if clock is not None else self.default_clock
 
-        # self._async_waiters: Dict[asyncio.Task, asyncio.Future] = OrderedDict()
+        self._async_waiters = None
 
     def __repr__(self):
         return f"<{self.__class__.__name__} - capacity: {self.max_capacity}, rate: {self.drip_rate}>"
@@ -62,75 +70,126 @@ class AbstractBaseBucket(ABC):
         Drop any outstanding connections or flush any data in subclasses that may require it
         """
 
+    def _get_state(self) -> Tuple[float, float]:
+        """
+        Returns the (current_volume, last_time_checked) pair of the bucket
+
+        Subclasses backed by a remote store should override this to fetch both values in a single read
+        """
+        return self.current_volume, self.last_time_checked
+
+    def _set_state(self, volume: Union[int, float], last_time_checked: float) -> None:
+        """
+        Stores the (current_volume, last_time_checked) pair of the bucket
+
+        Subclasses backed by a remote store should override this to write both values in a single call
+        """
+        self.current_volume = volume
+        self.last_time_checked = last_time_checked
+
+    def _leak(self, volume: Union[int, float], last_time_checked: float, now: float) -> float:
+        if not volume:
+            return volume
+        time_elapsed = (now - last_time_checked)
+        leaked_amount = time_elapsed * self.drip_rate.rate
+        return max(volume - leaked_amount, 0)
+
+    def _wait_time(self, volume: Union[int, float], task_cost: int = 1) -> float:
+        """
+        Exact number of seconds until volume + task_cost fits in the bucket, 0 if it already does
+        """
+        overflow = volume + task_cost - self.drip_rate.max_capacity
+        if overflow <= VOLUME_TOLERANCE:
+            return 0.0
+        return overflow / self.drip_rate.rate
+
     def _drip(self) -> None:
-        now = time.time()
-        if self.current_volume:
-            time_elapsed = (now - self.last_time_checked)
-            leaked_amount = time_elapsed * self.drip_rate.rate
-            self.current_volume = max(
-                self.current_volume - leaked_amount, 0
-            )
-        self.last_time_checked = now
+        now = self.clock.now()
+        volume, last_time_checked = self._get_state()
+        self._set_state(self._leak(volume, last_time_checked, now), now)
     
-    def is_full(self, task_cost: int = 1, async_: bool=False) -> bool:
+    def is_full(self, task_cost: int = 1) -> bool:
         self._drip()
-        # if async_ and (self.current_volume + task_cost) < self.drip_rate.max_capacity:
-        #     for fut in self._async_waiters.values():
-        #         if not fut.done():
-        #             fut.set_result(True)
-        #             break
         return (self.current_volume + task_cost) > self.drip_rate.max_capacity
 
-    def acquire_space(self, task_cost: int = 1):
+    def _try_consume(self, task_cost: int = 1, max_wait: float = 0.0) -> float:
+        """
+        Adds task_cost to the bucket if it fits within max_wait seconds, using one read and (on success) one write of
+        the bucket state. A non zero max_wait books space that only frees up in the future, leaving the bucket over
+        capacity until it has drained
+
+        Returns the number of seconds until the task would fit, the space has been acquired if it is <= max_wait
+        """
+        return self._try_consume_all([self], task_cost, max_wait)
+
+    @classmethod
+    def _try_consume_all(cls,
+        buckets: Sequence['AbstractBaseBucket'],
+        task_cost: int = 1,
+        max_wait: float = 0.0
+    ) -> float:
+        """
+        All or nothing version of _try_consume over several buckets of this class
+
+        Every bucket is checked first, and task_cost is only added to all of them if the longest wait across the
+        buckets is within max_wait. Returns that longest wait. Subclasses backed by a remote store should override
+        this to evaluate all of the buckets in a single call or transaction
+        """
+        now = buckets[0].clock.now() if buckets else 0.0
+        volumes = [
+            bucket._leak(volume, last_time_checked, now)
+            for bucket, (volume, last_time_checked) in zip(buckets, cls._get_states(buckets))
+        ]
+        wait = max(
+            (bucket._wait_time(volume, task_cost) for bucket, volume in zip(buckets, volumes)),
+            default=0.0
+        )
+        if wait <= max_wait:
+            cls._set_states(buckets, [(volume + task_cost, now) for volume in volumes])
+        return wait
+
+    @classmethod
+    def _get_states(cls, buckets: Sequence['AbstractBaseBucket']) -> List[Tuple[float, float]]:
+        """
+        Reads the state of several buckets, subclasses may override this to batch the reads
+        """
+        return [bucket._get_state() for bucket in buckets]
+
+    @classmethod
+    def _set_states(cls, buckets: Sequence['AbstractBaseBucket'], states: Sequence[Tuple[float, float]]) -> None:
+        """
+        Writes the state of several buckets, subclasses may override this to batch the writes
+        """
+        for bucket, state in zip(buckets, states):
+            bucket._set_state(*state)
 
+    def _check_cost(self, task_cost: int) -> None:
         if task_cost > self.drip_rate.max_capacity:
             raise ValueError(f"Cannot drip more than the max rate of {self.drip_rate.max_capacity}")
 
-        while self.is_full(task_cost):
-            # print(f"{self} is full against {self.drip_rate}")
-            time.sleep((1 / self.drip_rate.rate) * task_cost)
-        
-        self.current_volume += task_cost
+    def acquire_space(self, task_cost: int = 1):
+        self._check_cost(task_cost)
+
+        wait = self._try_consume(task_cost)
+        while wait:
+            self.clock.sleep(wait)
+            wait = self._try_consume(task_cost)
     
-    # async def async_acquire_space(self, task_cost: int = 1):
-    #     if task_cost > self.drip_rate.max_capacity:
-    #         raise ValueError(f"Cannot drip more than the max rate of {self.drip_rate.max_capacity}")
-
-    #     while self.is_full(task_cost):
-    #         # await asyncio.sleep((1 / self.drip_rate.rate) * task_cost)
-    #         time.sleep((1 / self.drip_rate.rate) * task_cost)
-        
-    #     self.current_volume += task_cost
-
-    # async def async_acquire_space(self, task_cost: int = 1):
-    #     """
-    #     :task_cost: assumes each task only takes 1 unit of the buckets total capacity
-    #     """
-
-    #     loop = asyncio.get_event_loop()
-    #     task = asyncio.current_task(loop)
-    #     assert task is not None
-
-    #     if task_cost > self.drip_rate.max_capacity:
-    #         raise ValueError(f"Can't emit more than the max rate of {self.drip_rate.max_capacity}")
-
-    #     # while the bucket is full
-    #     while self.is_full(task_cost, async_=True):
-    #         fut = loop.create_future()
-    #         self._async_waiters[task] = fut
-    #         try:
-    #             # block an asynchronous task from running while the bucket is full
-    #             blocking_time = (1 / self.drip_rate.rate) * task_cost
-    #             await asyncio.wait_for(
-    #                 asyncio.shield(fut), blocking_time, loop=loop
-    #             )
-    #         except asyncio.TimeoutError:
-    #             pass
-            
-    #         fut.cancel()
-
-    #     self._async_waiters.pop(task, None)
-    #     self.current_volume += task_cost
+    async def async_acquire_space(self, task_cost: int = 1):
+        """
+        Asynchronous counterpart to acquire_space
+
+        Waiting tasks are queued in FIFO order and only the task at the head of the queue polls the bucket,
+        the rest are parked until it is their turn. Sleeping is done with the clock's async_sleep so the event
+        loop is free to run other work while the bucket is full.
+
+        :task_cost: assumes each task only takes 1 unit of the buckets total capacity
+        """
+        self._check_cost(task_cost)
+
+        if self._async_waiters is None:
+            self._async_waiters = AsyncWaiterQueue()
+        await self._async_waiters.wait(lambda: self._try_consume(task_cost), self.clock.async_sleep)
 
     def __enter__(self) -> None:
         self.acquire_space()
@@ -139,8 +198,7 @@ class AbstractBaseBucket(ABC):
         pass
 
     async def __aenter__(self) -> None:
-        # await self.async_acquire_space()
-        await self.acquire_space()
+        await self.async_acquire_space()
     
     async def __aexit__(self, *exc) -> None:
         pass
\ No newline at end of file
@@ -1,5 +1,6 @@
 from typing import Union
 from .base import AbstractBaseBucket
+from ..clock import Clock, MonotonicClock
 
 class InMemoryBucket(AbstractBaseBucket):
     """
@@ -7,9 +8,12 @@ class InMemoryBucket(AbstractBaseBucket):
 
     Useful for instances where persistance doesn't matter and all code is executed within a single process
     """
+    __slots__ = ('_current_volume', '_last_time_checked')
 
-    def __init__(self, *args):
-        super(InMemoryBucket, self).__init__(*args)
+    default_clock: Clock = MonotonicClock()
+
+    def __init__(self, *args, **kwargs):
+        super(InMemoryBucket, self).__init__(*args, **kwargs)
 
         self._current_volume = 0
         self._last_time_checked = 0
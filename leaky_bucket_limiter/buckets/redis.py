@@ -1,6 +1,52 @@
 import redis
-from typing import Union
+from typing import List, Sequence, Tuple, Union
 from .base import AbstractBaseBucket
+from ..clock import Clock
+from ..constants import VOLUME_TOLERANCE
+
+# Drips every bucket in KEYS, checks them all for space and only consumes from all of them if the longest wait is
+# within max_wait, in a single round trip. ARGV holds the current time, task cost and max wait ('inf' for no limit)
+# followed by a (capacity, rate) pair per key. Returns the longest wait in seconds as a string (Lua numbers are
+# truncated to integers in redis replies), the task was admitted if it is <= max_wait. Each hash is set to expire
+# once its bucket would have fully drained so idle buckets don't linger.
+CONSUME_SCRIPT = f"""
+local VOLUME_TOLERANCE = {VOLUME_TOLERANCE!r}
+local now = tonumber(ARGV[1])
+local cost = tonumber(ARGV[2])
+local max_wait = tonumber(ARGV[3]) or math.huge
+local volumes = {{}}
+local wait = 0
+
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 + i * 2])
+    local rate = tonumber(ARGV[3 + i * 2])
+    local state = redis.call('HMGET', key, 'volume', 'last')
+    local volume = tonumber(state[1]) or 0
+    local last = tonumber(state[2]) or 0
+
+    if volume > 0 then
+        volume = math.max(volume - (now - last) * rate, 0)
+    end
+
+    local overflow = volume + cost - capacity
+    if overflow > VOLUME_TOLERANCE then
+        wait = math.max(wait, overflow / rate)
+    end
+    volumes[i] = volume
+end
+
+if wait > max_wait then
+    return string.format('%.17g', wait)
+end
+
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[3 + i * 2])
+    local volume = volumes[i] + cost
+    redis.call('HSET', key, 'volume', string.format('%.17g', volume), 'last', string.format('%.17g', now))
+    redis.call('PEXPIRE', key, math.ceil(volume / rate * 1000) + 1000)
+end
+return string.format('%.17g', wait)
+"""
 
 class RedisBucket(AbstractBaseBucket):
     """
@@ -15,32 +61,121 @@ class RedisBucket(AbstractBaseBucket):
             -> Database to connect to (defaults to 0)
         :redis_password: 
             -> Password if applicable
+        :atomic:
+            -> If true, the bucket state is kept in a single hash and every acquisition is made with one server side
+            script call (drip, check and consume in a single round trip). This keeps limits exact when the bucket is
+            shared between many processes. Defaults to false, which keeps the separate volume/last keys
+        :clock:
+            -> Clock used for the drip math, defaults to the wall clock so every client shares the same epoch
     """
     def __init__(self, 
         *args, 
         redis_host: str=None,
         redis_port: int=None,
         redis_database: int=0,
-        redis_password: str = None
+        redis_password: str = None,
+        atomic: bool = False,
+        clock: Clock = None
     ):
-        super(RedisBucket, self).__init__(*args)
+        super(RedisBucket, self).__init__(*args, clock=clock)
 
+        self.atomic = atomic
         self.connection = redis.from_url(
             f"redis://{f':{redis_password}@' if redis_password else ''}{redis_host}:{redis_port}/{redis_database}"
         )
+        self._consume_script = self.connection.register_script(CONSUME_SCRIPT)
+
+    @property
+    def state_key(self) -> str:
+        return f"{self.bucket_id}:state"
 
     @property
     def current_volume(self):
+        if self.atomic:
+            return float((self.connection.hget(self.state_key, 'volume') or b'0').decode('utf-8'))
         return float((self.connection.get(f"{self.bucket_id}:volume") or b'0').decode('utf-8'))
     
     @current_volume.setter
     def current_volume(self, volume: Union[int, float]):
-        self.connection.set(f"{self.bucket_id}:volume", volume)
+        if self.atomic:
+            self.connection.hset(self.state_key, 'volume', volume)
+        else:
+            self.connection.set(f"{self.bucket_id}:volume", volume)
 
     @property
     def last_time_checked(self):
+        if self.atomic:
+            return float((self.connection.hget(self.state_key, 'last') or b'0').decode('utf-8'))
         return float((self.connection.get(f"{self.bucket_id}:last") or b'0').decode('utf-8'))
     
     @last_time_checked.setter
     def last_time_checked(self, time: float):
-        self.connection.set(f"{self.bucket_id}:last", float(time))
\ No newline at end of file
+        if self.atomic:
+            self.connection.hset(self.state_key, 'last', float(time))
+        else:
+            self.connection.set(f"{self.bucket_id}:last", float(time))
+
+    def tear_down(self):
+        pass
+
+    def _get_state(self) -> Tuple[float, float]:
+        if self.atomic:
+            volume, last = self.connection.hmget(self.state_key, 'volume', 'last')
+        else:
+            volume, last = self.connection.mget(f"{self.bucket_id}:volume", f"{self.bucket_id}:last")
+        return float((volume or b'0').decode('utf-8')), float((last or b'0').decode('utf-8'))
+
+    def _set_state(self, volume: Union[int, float], last_time_checked: float) -> None:
+        if self.atomic:
+            self.connection.hset(self.state_key, mapping={'volume': volume, 'last': float(last_time_checked)})
+        else:
+            self.connection.mset({
+                f"{self.bucket_id}:volume": volume,
+                f"{self.bucket_id}:last": float(last_time_checked)
+            })
+
+    @classmethod
+    def _try_consume_all(cls,
+        buckets: Sequence['RedisBucket'],
+        task_cost: int = 1,
+        max_wait: float = 0.0
+    ) -> float:
+        if not buckets or not all(bucket.atomic for bucket in buckets):
+            return super(RedisBucket, cls)._try_consume_all(buckets, task_cost, max_wait)
+
+        args = [buckets[0].clock.now(), task_cost, max_wait]
+        for bucket in buckets:
+            args += [bucket.drip_rate.max_capacity, bucket.drip_rate.rate]
+
+        wait = buckets[0]._consume_script(
+            keys=[bucket.state_key for bucket in buckets],
+            args=args,
+            client=buckets[0].connection
+        )
+        return float(wait)
+
+    @classmethod
+    def _get_states(cls, buckets: Sequence['RedisBucket']) -> List[Tuple[float, float]]:
+        pipeline = buckets[0].connection.pipeline(transaction=False)
+        for bucket in buckets:
+            if bucket.atomic:
+                pipeline.hmget(bucket.state_key, 'volume', 'last')
+            else:
+                pipeline.mget(f"{bucket.bucket_id}:volume", f"{bucket.bucket_id}:last")
+        return [
+            (float((volume or b'0').decode('utf-8')), float((last or b'0').decode('utf-8')))
+            for volume, last in pipeline.execute()
+        ]
+
+    @classmethod
+    def _set_states(cls, buckets: Sequence['RedisBucket'], states: Sequence[Tuple[float, float]]) -> None:
+        pipeline = buckets[0].connection.pipeline(transaction=False)
+        for bucket, (volume, last_time_checked) in zip(buckets, states):
+            if bucket.atomic:
+                pipeline.hset(bucket.state_key, mapping={'volume': volume, 'last': float(last_time_checked)})
+            else:
+                pipeline.mset({
+                    f"{bucket.bucket_id}:volume": volume,
+                    f"{bucket.bucket_id}:last": float(last_time_checked)
+                })
+        pipeline.execute()
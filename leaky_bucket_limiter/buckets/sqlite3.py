@@ -6,8 +6,9 @@ import sqlite3
 import tempfile
 from typing import Generator
 
-from typing import Union
+from typing import List, Sequence, Tuple, Union
 from .base import AbstractBaseBucket
+from ..clock import Clock
 
 TEMP_DIR = tempfile.gettempdir()
 
@@ -43,6 +44,23 @@ UPDATE_BUCKET_LAST_CHECKED = """
     WHERE bucket = '{bucket}';
 """
 
+UPDATE_BUCKET_STATE = """
+    UPDATE rate_limit
+    SET current_volume = ?, last_time_checked = ?
+    WHERE bucket = ?;
+"""
+
+SELECT_BUCKETS = """
+    SELECT bucket, current_volume, last_time_checked FROM rate_limit
+    WHERE bucket IN ({placeholders});
+"""
+
+REPLACE_BUCKET = """
+    INSERT OR REPLACE INTO rate_limit
+    (bucket, current_volume, max_volume, last_time_checked)
+    VALUES (?, ?, ?, ?);
+"""
+
 class SQLite3Bucket(AbstractBaseBucket):
     """
     SQLite3 bucket subclass
@@ -50,13 +68,18 @@ class SQLite3Bucket(AbstractBaseBucket):
     kwargs:
         :db_path: 
             -> SQLite3 db path, defaults to db named limiter.sqlite, located in the system's temp directory
+        :clock:
+            -> Clock used for the drip math, defaults to the wall clock so the db can be shared between processes
+
+    Any other kwargs are passed to sqlite3.connect
     """
     def __init__(self, 
         *args, 
         db_path: str = os.path.join(TEMP_DIR, 'limiter.sqlite'),
+        clock: Clock = None,
         **kwargs
     ):
-        super(SQLite3Bucket, self).__init__(*args)
+        super(SQLite3Bucket, self).__init__(*args, clock=clock)
 
         self.db_path = db_path
         self.kwargs_ = kwargs
@@ -96,6 +119,59 @@ class SQLite3Bucket(AbstractBaseBucket):
         ))
         self.connection.commit()
 
+    def _get_state(self) -> Tuple[float, float]:
+        data = self.get_bucket()
+        return data['current_volume'], data['last_time_checked'].timestamp()
+
+    def _set_state(self, volume: Union[int, float], last_time_checked: float) -> None:
+        self.connection.execute(UPDATE_BUCKET_STATE, (
+            volume, str(datetime.datetime.fromtimestamp(last_time_checked)), self.bucket_id
+        ))
+        self.connection.commit()
+
+    @classmethod
+    def _try_consume_all(cls,
+        buckets: Sequence['SQLite3Bucket'],
+        task_cost: int = 1,
+        max_wait: float = 0.0
+    ) -> float:
+        """
+        Evaluates every bucket inside one immediate transaction on the first bucket's connection, so processes
+        sharing the database can't interleave between the check and the consume
+        """
+        if not buckets:
+            return 0.0
+
+        connection = buckets[0].connection
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            wait = super(SQLite3Bucket, cls)._try_consume_all(buckets, task_cost, max_wait)
+        except BaseException:
+            connection.rollback()
+            raise
+        connection.commit()
+        return wait
+
+    @classmethod
+    def _get_states(cls, buckets: Sequence['SQLite3Bucket']) -> List[Tuple[float, float]]:
+        cursor = buckets[0].connection.execute(
+            SELECT_BUCKETS.format(placeholders=", ".join("?" for _ in buckets)),
+            [bucket.bucket_id for bucket in buckets]
+        )
+        rows = {
+            bucket_id: (volume, datetime.datetime.fromisoformat(last_time_checked).timestamp())
+            for bucket_id, volume, last_time_checked in cursor.fetchall()
+        }
+        return [rows.get(bucket.bucket_id, (0, 0)) for bucket in buckets]
+
+    @classmethod
+    def _set_states(cls, buckets: Sequence['SQLite3Bucket'], states: Sequence[Tuple[float, float]]) -> None:
+        # committed by _try_consume_all
+        buckets[0].connection.executemany(REPLACE_BUCKET, [
+            (bucket.bucket_id, volume, bucket.max_capacity, str(datetime.datetime.fromtimestamp(last_time_checked)))
+            for bucket, (volume, last_time_checked) in zip(buckets, states)
+        ])
+
     def tear_down(self):
         if self._connection:
             self.connection.close()
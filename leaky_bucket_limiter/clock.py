@@ -0,0 +1,75 @@
+import time
+import asyncio
+from abc import ABC, abstractmethod
+
+class Clock(ABC):
+    """
+    Source of time used by buckets and limiters for drip math and for sleeping while a bucket is full
+    """
+    __slots__ = ()
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} - {self.now()}>"
+
+    @abstractmethod
+    def now(self) -> float:
+        """
+        Current time in seconds
+        """
+
+    def sleep(self, seconds: float) -> None:
+        time.sleep(seconds)
+
+    async def async_sleep(self, seconds: float) -> None:
+        await asyncio.sleep(seconds)
+
+class MonotonicClock(Clock):
+    """
+    Clock based on time.monotonic, which is immune to wall clock jumps (NTP adjustments, DST...)
+
+    Only meaningful within a single process, this is the default for in-memory buckets
+    """
+    __slots__ = ()
+
+    def now(self) -> float:
+        return time.monotonic()
+
+class WallClock(Clock):
+    """
+    Clock based on time.time, sharing the unix epoch with every other process and host
+
+    This is the default for persistent backends (redis, sqlite...) whose state is shared between processes
+    """
+    __slots__ = ()
+
+    def now(self) -> float:
+        return time.time()
+
+class VirtualClock(Clock):
+    """
+    Clock that only moves when told to, sleeping simply advances the time
+
+    Useful to simulate large numbers of acquisitions in tests and capacity planning without actually waiting
+
+    kwargs:
+        :start:
+            -> Initial time, defaults to 0
+    """
+    __slots__ = ('_now',)
+
+    def __init__(self, start: float = 0.0):
+        self._now = start
+
+    def now(self) -> float:
+        return self._now
+
+    def advance(self, seconds: float) -> None:
+        self._now += seconds
+
+    def sleep(self, seconds: float) -> None:
+        self.advance(seconds)
+
+    async def async_sleep(self, seconds: float) -> None:
+        self.advance(seconds)
+        # still yield to the event loop, as a real sleep would
+        await asyncio.sleep(0)
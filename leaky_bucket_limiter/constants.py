@@ -1,5 +1,9 @@
 from enum import Enum
 
+# Volume overflows smaller than this are treated as fitting in the bucket. Without it, floating point error can leave
+# a waiter that slept for exactly the computed time with a vanishingly small wait that never makes any progress
+VOLUME_TOLERANCE = 1e-9
+
 class TimeUnit(Enum):
     SECOND = 1
     MINUTE = SECOND * 60
@@ -0,0 +1,140 @@
+import functools
+import threading
+from collections import OrderedDict
+from inspect import iscoroutinefunction
+from typing import Callable, Dict, Hashable, Optional
+from .admission import Admission
+from .buckets import AbstractBaseBucket, InMemoryBucket
+from .clock import Clock
+from .rate_limiter import RateLimiter
+
+class _KeyEntry(object):
+    __slots__ = ('limiter', 'last_used')
+
+    def __init__(self, limiter: RateLimiter, last_used: float):
+        self.limiter = limiter
+        self.last_used = last_used
+
+class KeyedRateLimiter(object):
+    """
+    Rate limiter that applies the same rate limits to every key (user, api key, ip address...) independently
+
+    A RateLimiter is lazily created the first time a key is seen, and kept in a least recently used registry so
+    lookups are O(1). Keys that have been idle for longer than the ttl, or that fall off the end of the registry once
+    it holds more than max_keys, are evicted.
+
+    args:
+        :identifier:
+            -> Prefix of the per key limiter identifiers, which are named "{identifier}:{key}"
+        :rates:
+            -> 1 or more Rate instances, shared by every key
+
+    kwargs:
+        :key_func:
+            -> Callable taking the decorated function's arguments and returning the key to limit on. Only required
+            when the limiter is used as a decorator
+        :bucket_class:
+            -> Bucket class used for every key, defaults to InMemoryBucket
+        :bucket_kwargs:
+            -> Keyword arguments passed to every bucket
+        :max_keys:
+            -> Maximum number of keys to hold at once, defaults to unbounded
+        :ttl:
+            -> Seconds a key may sit idle before it is evicted. Defaults to the longest rate's time period, after
+            which an idle in-memory bucket has fully drained so evicting it loses nothing
+        :clock:
+            -> Clock shared by every key's limiter, also used to track idle time. Defaults to the bucket class's
+            default clock
+    """
+    def __init__(self,
+        identifier: str,
+        *rates,
+        key_func: Callable[..., Hashable] = None,
+        bucket_class: AbstractBaseBucket = InMemoryBucket,
+        bucket_kwargs: dict = {},
+        max_keys: Optional[int] = None,
+        ttl: Optional[float] = None,
+        clock: Clock = None
+    ):
+        self.identifier = identifier
+        self.rates = RateLimiter._sort_rates(rates)
+        self.key_func = key_func
+        self.bucket_class = bucket_class
+        self.bucket_kwargs = bucket_kwargs
+        self.max_keys = max_keys
+        self.ttl = ttl if ttl is not None else max((rate.time_period for rate in self.rates), default=0)
+        self.clock = clock if clock is not None else bucket_class.default_clock
+
+        self._entries: Dict[Hashable, _KeyEntry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"<KeyedRateLimiter - {self.identifier}: {len(self)} keys, rates: {self.rates}>"
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def __getitem__(self, key: Hashable) -> RateLimiter:
+        """
+        Returns the RateLimiter for key, creating it if this is the first time the key has been seen
+        """
+        now = self.clock.now()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _KeyEntry(self._create_limiter(key), now)
+            else:
+                entry.last_used = now
+                self._entries.move_to_end(key)
+            self._evict(now)
+        return entry.limiter
+
+    def __call__(self, f):
+        if self.key_func is None:
+            raise ValueError("A key_func is required to use a KeyedRateLimiter as a decorator")
+
+        if iscoroutinefunction(f):
+            @functools.wraps(f)
+            async def wrapper(*args, **kwargs):
+                await self[self.key_func(*args, **kwargs)]._async_do_acquire()
+                return await f(*args, **kwargs)
+        else:
+            @functools.wraps(f)
+            def wrapper(*args, **kwargs):
+                self[self.key_func(*args, **kwargs)]._do_acquire()
+                return f(*args, **kwargs)
+
+        return wrapper
+
+    def _create_limiter(self, key: Hashable) -> RateLimiter:
+        return RateLimiter(
+            f"{self.identifier}:{key}",
+            *self.rates,
+            bucket_class=self.bucket_class,
+            bucket_kwargs=self.bucket_kwargs,
+            clock=self.clock
+        )
+
+    def _evict(self, now: float) -> None:
+        # the registry is ordered by last use, so expired keys are always at the front
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            over_size = self.max_keys is not None and len(self._entries) > self.max_keys
+            if not over_size and now - entry.last_used <= self.ttl:
+                break
+            del self._entries[key]
+
+    def acquire(self, key: Hashable, task_cost: int = 1) -> None:
+        self[key]._do_acquire(task_cost)
+
+    async def async_acquire(self, key: Hashable, task_cost: int = 1) -> None:
+        await self[key]._async_do_acquire(task_cost)
+
+    def try_acquire(self, key: Hashable, task_cost: int = 1, max_wait: float = 0.0) -> Admission:
+        return self[key].try_acquire(task_cost, max_wait)
+
+    def reserve(self, key: Hashable, task_cost: int = 1, max_wait: Optional[float] = None) -> Admission:
+        return self[key].reserve(task_cost, max_wait)
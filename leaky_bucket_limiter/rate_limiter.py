@@ -2,29 +2,46 @@ import functools
 from inspect import iscoroutinefunction
 from typing import List, Iterable
 from .rate import Rate
+from .admission import AdmissionMixin
+from .clock import Clock
 from .buckets import AbstractBaseBucket, InMemoryBucket
+from .waiters import AsyncWaiterQueue
 
-class RateLimiter(object):
+class RateLimiter(AdmissionMixin):
     """
     Rate limiter class that takes 1 or more rate limits
+
+    kwargs:
+        :bucket_class:
+            -> Bucket class used for every rate, defaults to InMemoryBucket
+        :bucket_kwargs:
+            -> Keyword arguments passed to every bucket
+        :clock:
+            -> Clock shared by every bucket, defaults to the bucket class's default clock
     """
+    __slots__ = ('identifier', 'bucket_class', 'bucket_kwargs', 'clock', 'buckets', '_async_waiters', '__weakref__')
+
     def __init__(self,
         identifier: str,
         *rates,
         bucket_class: AbstractBaseBucket=InMemoryBucket,
         bucket_kwargs: dict = {},
+        clock: Clock = None,
         **kwargs
     ):
         self.identifier = identifier
         self.bucket_class = bucket_class
         self.bucket_kwargs = bucket_kwargs
+        self.clock = clock if clock is not None else bucket_class.default_clock
         self.buckets: List[AbstractBaseBucket] = []
+        self._async_waiters = None
 
         for index, rate in enumerate(self._sort_rates(rates)):
             self.buckets.append(self.bucket_class(
                 f"{self.identifier}:{index}",
                 rate.max_capacity,
                 rate,
+                clock=self.clock,
                 **self.bucket_kwargs
             ))
 
@@ -36,7 +53,7 @@ class RateLimiter(object):
         if iscoroutinefunction(f):
             @functools.wraps(f)
             async def wrapper(*args, **kwargs):
-                self._do_acquire()
+                await self._async_do_acquire()
                 return await f(*args, **kwargs)
         else:
             @functools.wraps(f)
@@ -46,13 +63,32 @@ class RateLimiter(object):
             
         return wrapper
         
-    def _do_acquire(self):
+    def _check_cost(self, task_cost: int) -> None:
         for bucket in self.buckets:
-            bucket.acquire_space()
+            if task_cost > bucket.drip_rate.max_capacity:
+                raise ValueError(f"Cannot drip more than the max rate of {bucket.drip_rate.max_capacity}")
+
+    def _try_consume(self, task_cost: int = 1, max_wait: float = 0.0) -> float:
+        """
+        Checks every rate and only consumes task_cost from all of the buckets together if the longest wait is within
+        max_wait, so a full bucket never wastes the capacity of the others. Returns the longest wait
+        """
+        return self.bucket_class._try_consume_all(self.buckets, task_cost, max_wait)
 
-    # async def _async_do_acquire(self):
-    #     for bucket in self.buckets:
-    #         await bucket.async_acquire_space()
+    def _do_acquire(self, task_cost: int = 1):
+        self._check_cost(task_cost)
+
+        wait = self._try_consume(task_cost)
+        while wait:
+            self.clock.sleep(wait)
+            wait = self._try_consume(task_cost)
+
+    async def _async_do_acquire(self, task_cost: int = 1):
+        self._check_cost(task_cost)
+
+        if self._async_waiters is None:
+            self._async_waiters = AsyncWaiterQueue()
+        await self._async_waiters.wait(lambda: self._try_consume(task_cost), self.clock.async_sleep)
 
     @staticmethod
     def _sort_rates(rates: Iterable[Rate]):
@@ -65,8 +101,7 @@ class RateLimiter(object):
         pass
 
     async def __aenter__(self) -> None:
-        # await self._async_do_acquire()
-        self._do_acquire()
+        await self._async_do_acquire()
     
     async def __aexit__(self, *exc) -> None:
         pass
\ No newline at end of file
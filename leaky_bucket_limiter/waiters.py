@@ -0,0 +1,51 @@
+import asyncio
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict
+
+class AsyncWaiterQueue(object):
+    """
+    FIFO queue of asyncio tasks waiting for space in one or more buckets
+
+    Only the task at the head of the queue polls the bucket(s), sleeping (asynchronously) for exactly as long as it
+    was told to wait. Every other task is parked on a future until the task ahead of it has been admitted (or
+    cancelled), so thousands of throttled tasks cost nothing while they wait.
+    """
+    def __init__(self):
+        self._waiters: Dict[asyncio.Task, asyncio.Future] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._waiters)
+
+    async def wait(self,
+        try_consume: Callable[[], float],
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep
+    ) -> None:
+        """
+        :try_consume: callable that attempts to take the space, returning 0 on success or the seconds to wait otherwise
+        :sleep: coroutine function used to sleep, typically a clock's async_sleep
+        """
+        loop = asyncio.get_running_loop()
+        task = asyncio.current_task(loop)
+        assert task is not None
+
+        fut = loop.create_future()
+        self._waiters[task] = fut
+        if len(self._waiters) == 1:
+            # nobody else is waiting, go straight to the head of the queue
+            fut.set_result(True)
+
+        try:
+            await fut
+            wait = try_consume()
+            while wait:
+                await sleep(wait)
+                wait = try_consume()
+        finally:
+            self._waiters.pop(task, None)
+            self._wake_next()
+
+    def _wake_next(self) -> None:
+        for fut in self._waiters.values():
+            if not fut.done():
+                fut.set_result(True)
+            break
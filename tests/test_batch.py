@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+
+import random
+import unittest
+
+from leaky_bucket_limiter import (
+    Rate,
+    TimeUnit,
+    InMemoryBucket,
+    BatchBucketEngine,
+    VirtualClock
+)
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+@unittest.skipUnless(numpy, "numpy is required for the batch engine")
+class TestBatchBucketEngine(unittest.TestCase):
+    """Tests for vectorised acquisition in BatchBucketEngine."""
+
+    def setUp(self):
+        self.rate = Rate(5, TimeUnit.SECOND)
+
+    def test_matches_bucket_math(self):
+        clock = VirtualClock(1000)
+        engine = BatchBucketEngine(self.rate, initial_size=4, clock=clock)
+        buckets = {}
+        rng = random.Random(42)
+
+        for _ in range(20):
+            clock.advance(rng.random())
+            keys = [rng.randrange(10) for _ in range(30)]
+
+            admitted, retry_after = engine.acquire_batch(keys, 1)
+
+            for key, admit, retry in zip(keys, admitted, retry_after):
+                bucket = buckets.setdefault(key, InMemoryBucket(f"{key}", 5, self.rate, clock=clock))
+                wait = bucket._try_consume()
+                self.assertEqual(bool(admit), not wait)
+                self.assertAlmostEqual(retry, wait)
+
+        for key, bucket in buckets.items():
+            self.assertAlmostEqual(engine.current_volume(key), bucket.current_volume)
+        self.assertEqual(len(engine), len(buckets))
+
+    def test_variable_costs(self):
+        engine = BatchBucketEngine(self.rate)
+        admitted, retry_after = engine.acquire_batch(["a", "b", "a", "a", "c"], [3, 6, 2, 1, 5], now=0.0)
+
+        self.assertEqual(admitted.tolist(), [True, False, True, False, True])
+        self.assertEqual(retry_after[1], float('inf'))
+        self.assertAlmostEqual(retry_after[3], 1 / 5)
+        self.assertEqual(engine.current_volume("a"), 5)
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from leaky_bucket_limiter import (
+    Rate,
+    TimeUnit,
+    InMemoryBucket,
+    SQLite3Bucket,
+    VirtualClock
+)
+
+class TestBucketWaitTime(unittest.TestCase):
+    """Tests for the exact wait time computation shared by every bucket."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.rate = Rate(5, TimeUnit.SECOND)
+        self.buckets = {
+            'memory': InMemoryBucket("test_bucket", self.rate.max_capacity, self.rate,
+                clock=VirtualClock(1000)
+            ),
+            'sqlite3': SQLite3Bucket("test_bucket", self.rate.max_capacity, self.rate,
+                db_path=os.path.join(self.tmp_dir.name, 'limiter.sqlite'),
+                clock=VirtualClock(1000)
+            )
+        }
+
+    def tearDown(self):
+        for bucket in self.buckets.values():
+            bucket.tear_down()
+        self.tmp_dir.cleanup()
+
+    def test_try_consume_returns_exact_wait(self):
+        for name, bucket in self.buckets.items():
+            with self.subTest(bucket=name):
+                for _ in range(5):
+                    self.assertEqual(bucket._try_consume(), 0)
+                # a full bucket of 5 leaking 5 per second frees 2 units in 0.4 seconds
+                self.assertAlmostEqual(bucket._try_consume(2), 0.4)
+                self.assertAlmostEqual(bucket.current_volume, 5)
+
+    def test_acquire_space_sleeps_once(self):
+        for name, bucket in self.buckets.items():
+            with self.subTest(bucket=name):
+                with patch.object(VirtualClock, 'sleep', autospec=True, side_effect=VirtualClock.advance) as mock_sleep:
+                    for _ in range(6):
+                        bucket.acquire_space()
+
+                mock_sleep.assert_called_once()
+                self.assertAlmostEqual(mock_sleep.call_args[0][1], 0.2)
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+
+import unittest
+
+from leaky_bucket_limiter import (
+    Rate,
+    TimeUnit,
+    KeyedRateLimiter,
+    VirtualClock
+)
+
+class TestKeyedRateLimiter(unittest.TestCase):
+    """Tests for per key limits in KeyedRateLimiter."""
+
+    def setUp(self):
+        self.rate = Rate(2, TimeUnit.SECOND)
+
+    def test_keys_are_limited_independently(self):
+        limiter = KeyedRateLimiter("test_limiter", self.rate, clock=VirtualClock())
+        self.assertTrue(limiter.try_acquire("alice"))
+        self.assertTrue(limiter.try_acquire("alice"))
+        self.assertFalse(limiter.try_acquire("alice"))
+        self.assertTrue(limiter.try_acquire("bob"))
+
+        self.assertEqual(limiter["alice"].buckets[0].bucket_id, "test_limiter:alice:0")
+        self.assertEqual(len(limiter), 2)
+
+    def test_decorator_uses_key_func(self):
+        limiter = KeyedRateLimiter("test_limiter", self.rate, key_func=lambda user, *args: user, clock=VirtualClock())
+
+        @limiter
+        def request(user, value):
+            return value
+
+        self.assertEqual(request("alice", 1), 1)
+        self.assertEqual(request("bob", 2), 2)
+
+        self.assertEqual(set(limiter._entries), {"alice", "bob"})
+        self.assertAlmostEqual(limiter["alice"].buckets[0].current_volume, 1)
+
+    def test_least_recently_used_keys_are_evicted(self):
+        limiter = KeyedRateLimiter("test_limiter", self.rate, max_keys=2)
+        limiter["a"]
+        limiter["b"]
+        limiter["a"]
+        limiter["c"]
+
+        self.assertIn("a", limiter)
+        self.assertNotIn("b", limiter)
+        self.assertIn("c", limiter)
+
+    def test_idle_keys_expire(self):
+        clock = VirtualClock()
+        limiter = KeyedRateLimiter("test_limiter", self.rate, clock=clock)
+        self.assertEqual(limiter.ttl, 1)
+
+        limiter["a"]
+        clock.advance(0.5)
+        limiter["b"]
+        clock.advance(0.75)
+        limiter["b"]
+
+        self.assertNotIn("a", limiter)
+        self.assertIn("b", limiter)
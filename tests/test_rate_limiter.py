@@ -1,6 +1,9 @@
 #!/usr/bin/env python
 
+import os
+import asyncio
 import datetime
+import tempfile
 import unittest
 from unittest.mock import Mock
 
@@ -8,9 +11,17 @@ from leaky_bucket_limiter import (
     Rate,
     TimeUnit,
     RateLimiter,
-    InMemoryBucket
+    InMemoryBucket,
+    RedisBucket,
+    SQLite3Bucket,
+    VirtualClock
 )
 
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
 class TestRateLimiter(unittest.TestCase):
     """Tests for normal contexts in RateLimiter class."""
 
@@ -95,6 +106,114 @@ class TestRateLimiter(unittest.TestCase):
         self.assertEqual(len(responses), num_tasks)
         self.assertGreaterEqual(time_taken, self.get_min_time(num_tasks, self.base_rate_with_burst))
 
+class TestVirtualClock(unittest.IsolatedAsyncioTestCase):
+    """Tests for simulating acquisitions without sleeping."""
+
+    def setUp(self):
+        self.clock = VirtualClock()
+        self.limiter = RateLimiter("test_limiter",
+            Rate(5, TimeUnit.SECOND, allow_burst=False),
+            clock=self.clock
+        )
+
+    def test_sleep_advances_virtual_time(self):
+        for _ in range(1000):
+            with self.limiter:
+                pass
+
+        # 1 request per 0.2 seconds, the first one is free
+        self.assertAlmostEqual(self.clock.now(), 999 * 0.2)
+
+    async def test_async_sleep_advances_virtual_time(self):
+        async def do_thing():
+            async with self.limiter:
+                return self.clock.now()
+
+        times = await asyncio.gather(*[do_thing() for _ in range(100)])
+
+        self.assertEqual(times, sorted(times))
+        self.assertAlmostEqual(self.clock.now(), 99 * 0.2)
+
+class BackendLimiterTestCase(unittest.TestCase):
+    """Builds the same multi rate limiter on every available backend."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.rates = (Rate(3, TimeUnit.MINUTE), Rate(2, TimeUnit.SECOND))
+        self.clock = VirtualClock(1000)
+        self.limiters = {
+            'memory': RateLimiter("test_limiter", *self.rates, bucket_class=InMemoryBucket, clock=self.clock),
+            'sqlite3': RateLimiter("test_limiter", *self.rates,
+                bucket_class=SQLite3Bucket,
+                clock=self.clock,
+                bucket_kwargs={'db_path': os.path.join(self.tmp_dir.name, 'limiter.sqlite')}
+            )
+        }
+        if fakeredis:
+            server = fakeredis.FakeServer()
+            self.limiters['redis'] = RateLimiter("test_limiter", *self.rates,
+                bucket_class=RedisBucket,
+                clock=self.clock,
+                bucket_kwargs={'redis_host': 'localhost', 'redis_port': 6379, 'atomic': True}
+            )
+            for bucket in self.limiters['redis'].buckets:
+                bucket.connection = fakeredis.FakeRedis(server=server)
+
+    def tearDown(self):
+        for limiter in self.limiters.values():
+            for bucket in limiter.buckets:
+                bucket.tear_down()
+        self.tmp_dir.cleanup()
+
+class TestMultiRateAcquire(BackendLimiterTestCase):
+    """Tests for all or nothing acquisition across several rates."""
+
+    def test_full_bucket_does_not_consume_others(self):
+        for name, limiter in self.limiters.items():
+            with self.subTest(limiter=name):
+                per_second, per_minute = limiter.buckets
+                self.assertEqual(limiter._try_consume(), 0)
+                self.assertEqual(limiter._try_consume(), 0)
+                self.clock.advance(1)
+                self.assertEqual(limiter._try_consume(), 0)
+                self.clock.advance(1)
+
+                # the per second bucket has drained but the per minute one is full, neither should be consumed
+                self.assertAlmostEqual(limiter._try_consume(), 0.9 / (3 / 60))
+                self.assertAlmostEqual(per_second.current_volume, 1)
+                self.assertAlmostEqual(per_minute.current_volume, 2.95)
+
+class TestNonBlockingAcquire(BackendLimiterTestCase):
+    """Tests for try_acquire and reserve."""
+
+    def test_try_acquire_rejects_with_retry_after(self):
+        for name, limiter in self.limiters.items():
+            with self.subTest(limiter=name):
+                self.assertTrue(limiter.try_acquire())
+                self.assertTrue(limiter.try_acquire())
+
+                admission = limiter.try_acquire()
+                self.assertFalse(admission)
+                self.assertAlmostEqual(admission.retry_after, 0.5)
+                self.assertAlmostEqual(limiter.buckets[0].current_volume, 2)
+
+    def test_reserve_books_future_space(self):
+        for name, limiter in self.limiters.items():
+            with self.subTest(limiter=name):
+                self.assertEqual(limiter.reserve().retry_after, 0)
+                self.assertEqual(limiter.reserve().retry_after, 0)
+
+                admission = limiter.reserve()
+                self.assertTrue(admission)
+                self.assertAlmostEqual(admission.retry_after, 0.5)
+                self.assertAlmostEqual(limiter.buckets[0].current_volume, 3)
+
+                # shed load when the predicted wait (set by the per minute rate) is over budget, without booking
+                admission = limiter.reserve(max_wait=1.0)
+                self.assertFalse(admission)
+                self.assertAlmostEqual(admission.retry_after, 1 / (3 / 60))
+                self.assertAlmostEqual(limiter.buckets[0].current_volume, 3)
+
 class TestAsyncRateLimiter(unittest.IsolatedAsyncioTestCase):
     """Tests for async contexts in RateLimiter class."""
 
@@ -182,4 +301,29 @@ class TestAsyncRateLimiter(unittest.IsolatedAsyncioTestCase):
         responses, time_taken = await do_tasks(num_tasks=num_tasks)
 
         self.assertEqual(len(responses), num_tasks)
-        self.assertGreaterEqual(time_taken, self.get_min_time(num_tasks, self.base_rate_with_burst))
\ No newline at end of file
+        self.assertGreaterEqual(time_taken, self.get_min_time(num_tasks, self.base_rate_with_burst))
+
+    async def test_limiter_does_not_block_event_loop(self):
+        import time, asyncio
+
+        limiter = self.limiters['no_burst']
+        ticks = []
+
+        async def ticker():
+            while True:
+                ticks.append(time.time())
+                await asyncio.sleep(0.01)
+
+        @limiter
+        async def do_thing():
+            return datetime.datetime.now()
+
+        ticker_task = asyncio.create_task(ticker())
+        responses = await asyncio.gather(*[do_thing() for _ in range(5)])
+        ticker_task.cancel()
+
+        self.assertEqual(len(responses), 5)
+        # the limiter sleeps for roughly 0.8 seconds in total, the ticker should have kept running throughout
+        self.assertGreater(len(ticks), 20)
+        self.assertLess(max(b - a for a, b in zip(ticks, ticks[1:])), 0.15)
+        self.assertEqual(len(limiter._async_waiters), 0)
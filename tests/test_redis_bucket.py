@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+
+import threading
+import unittest
+
+from leaky_bucket_limiter import (
+    Rate,
+    TimeUnit,
+    RedisBucket,
+    VirtualClock
+)
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+@unittest.skipUnless(fakeredis, "fakeredis is required for redis bucket tests")
+class TestAtomicRedisBucket(unittest.TestCase):
+    """Tests for the single round trip scripted redis bucket."""
+
+    def setUp(self):
+        self.server = fakeredis.FakeServer()
+        self.rate = Rate(5, TimeUnit.SECOND)
+        self.clock = VirtualClock(1000)
+
+    def make_bucket(self, **kwargs) -> RedisBucket:
+        bucket = RedisBucket("test_bucket", self.rate.max_capacity, self.rate, atomic=True, clock=self.clock,
+            redis_host="localhost", redis_port=6379, **kwargs
+        )
+        bucket.connection = fakeredis.FakeRedis(server=self.server)
+        return bucket
+
+    def test_try_consume_returns_exact_wait(self):
+        bucket = self.make_bucket()
+        for _ in range(5):
+            self.assertEqual(bucket._try_consume(), 0)
+        self.assertAlmostEqual(bucket._try_consume(2), 0.4)
+        self.assertAlmostEqual(bucket.current_volume, 5)
+        self.assertEqual(bucket.last_time_checked, 1000.0)
+        self.assertIsNone(bucket.connection.get("test_bucket:volume"))
+
+    def test_concurrent_workers_do_not_overshoot(self):
+        buckets = [self.make_bucket() for _ in range(8)]
+        admitted = []
+
+        def worker(bucket):
+            for _ in range(10):
+                if not bucket._try_consume():
+                    admitted.append(1)
+
+        threads = [threading.Thread(target=worker, args=(b,)) for b in buckets]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(admitted), 5)